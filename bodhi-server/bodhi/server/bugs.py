@@ -59,7 +59,8 @@ class FakeBugTracker(object):
         """
         log.debug('__noop__(%s)' % str(args))
 
-    comment = update_details = modified = close = on_qa = __noop__
+    comment = connect = update_details = update_details_failed = __noop__
+    modified = close = on_qa = __noop__
 
 
 class InvalidComment(Exception):
@@ -90,6 +91,11 @@ class Bugzilla(object):
             self._bz = bugzilla.Bugzilla(url=url,
                                          cookiefile=None, tokenfile=None)
 
+    def connect(self) -> None:
+        """Create the Bugzilla client instance, unless it has been created already."""
+        if self._bz is None:
+            self._connect()
+
     @property
     def bz(self) -> bugzilla.Bugzilla:
         """
@@ -98,8 +104,7 @@ class Bugzilla(object):
         Returns:
             A client Bugzilla instance.
         """
-        if self._bz is None:
-            self._connect()
+        self.connect()
         return self._bz
 
     def getbug(self, bug_id: int) -> 'bugzilla.bug.Bug':
@@ -243,18 +248,8 @@ class Bugzilla(object):
         if not bug:
             try:
                 bug = self.bz.getbug(bug_entity.bug_id)
-            except xmlrpc_client.Fault as err:
-                if err.faultCode == 102:
-                    log.info('Cannot retrieve private bug #%d.', bug_entity.bug_id)
-                    bug_entity.title = 'Private bug'
-                else:
-                    log.exception(
-                        "Got fault from Bugzilla on #%d: fault code: %d, fault string: %s",
-                        bug_entity.bug_id, err.faultCode, err.faultString)
-                    bug_entity.title = 'Invalid bug number'
-                return
-            except Exception:
-                log.exception("Unknown exception from Bugzilla")
+            except Exception as err:
+                self.update_details_failed(err, bug_entity)
                 return
         if bug.product == 'Security Response':
             bug_entity.parent = True
@@ -266,6 +261,26 @@ class Bugzilla(object):
         if 'security' in [keyword.lower() for keyword in keywords]:
             bug_entity.security = True
 
+    def update_details_failed(self, err: Exception, bug_entity: 'models.Bug') -> None:
+        """
+        Update the details on bug_entity after Bugzilla failed to give us its bug.
+
+        Args:
+            err: The exception raised while retrieving the bug from Bugzilla.
+            bug_entity: The bug we wished to update.
+        """
+        if isinstance(err, xmlrpc_client.Fault):
+            if err.faultCode == 102:
+                log.info('Cannot retrieve private bug #%d.', bug_entity.bug_id)
+                bug_entity.title = 'Private bug'
+            else:
+                log.exception(
+                    "Got fault from Bugzilla on #%d: fault code: %d, fault string: %s",
+                    bug_entity.bug_id, err.faultCode, err.faultString, exc_info=err)
+                bug_entity.title = 'Invalid bug number'
+        else:
+            log.exception("Unknown exception from Bugzilla", exc_info=err)
+
     def modified(self, bug_id: typing.Union[int, str], comment: str) -> None:
         """
         Change the status of this bug to MODIFIED if not already MODIFIED, VERIFIED, or CLOSED.
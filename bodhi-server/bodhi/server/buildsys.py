@@ -180,6 +180,7 @@ class DevBuildsys:
         """Emulate Koji's taskFinished."""
         return True
 
+    @multicall_enabled
     def getTaskInfo(self, task: int) -> typing.Mapping[str, int]:
         """Emulate Koji's getTaskInfo."""
         return {'state': koji.TASK_STATES['CLOSED']}
@@ -358,6 +359,7 @@ class DevBuildsys:
         rpms += DevBuildsys.__rpms__
         return rpms
 
+    @multicall_enabled
     def listTags(self, build: str, *args, **kw) -> typing.List[typing.Dict[str, object]]:
         """Emulate Koji's listTags."""
         if 'el5' in build or 'el6' in build:
@@ -764,19 +766,38 @@ def wait_for_tasks(
         A list of failed tasks. An empty list indicates that all tasks completed successfully.
     """
     log.debug("Waiting for %d tasks to complete: %s" % (len(tasks), tasks))
-    failed_tasks = []
+    failed = set()
     if not session:
         session = get_session()
+    pending = []
     for task in tasks:
         if not task:
             log.debug("Skipping task: %s" % task)
             continue
-        while not session.taskFinished(task):
+        pending.append(task)
+    finished_states = (koji.TASK_STATES['CLOSED'], koji.TASK_STATES['CANCELED'],
+                       koji.TASK_STATES['FAILED'])
+    # Poll all the unfinished tasks with a single multicall per round, rather than polling each
+    # task in turn.
+    while pending:
+        session.multicall = True
+        for task in pending:
+            session.getTaskInfo(task)
+        results = session.multiCall()
+        still_pending = []
+        for task, result in zip(pending, results):
+            if not isinstance(result, list):
+                log.error("Unable to get info for Koji task %d: %r" % (task, result))
+                failed.add(task)
+            elif result[0]['state'] not in finished_states:
+                still_pending.append(task)
+            elif result[0]['state'] != koji.TASK_STATES['CLOSED']:
+                log.error("Koji task %d failed" % task)
+                failed.add(task)
+        pending = still_pending
+        if pending:
             time.sleep(sleep)
-        task_info = session.getTaskInfo(task)
-        if task_info['state'] != koji.TASK_STATES['CLOSED']:
-            log.error("Koji task %d failed" % task)
-            failed_tasks.append(task)
+    failed_tasks = [task for task in tasks if task in failed]
     log.debug("%d tasks completed successfully, %d tasks failed." % (
         len(tasks) - len(failed_tasks), len(failed_tasks)))
     return failed_tasks
@@ -19,6 +19,7 @@
 from datetime import datetime
 import logging
 import os
+import shlex
 import typing
 
 from pyramid import settings
@@ -158,6 +159,25 @@ def _validate_bool(value: typing.Union[str, bool]) -> bool:
     return value
 
 
+def _validate_cmdline(value: typing.Union[str, typing.List]) -> typing.List[str]:
+    """Return the command line arguments in value as a list.
+
+    A string is split with shell-like syntax, so arguments containing spaces can be quoted. A list
+    is passed through, with each of its elements converted to a string.
+
+    Args:
+        value: The command line arguments to be validated.
+    Returns:
+        The list of command line arguments.
+    Raises:
+        ValueError: If value cannot be interpreted as a list of arguments.
+    """
+    if isinstance(value, str):
+        value = shlex.split(value)
+
+    return _generate_list_validator()(value)
+
+
 def _validate_none_or(validator: typing.Callable[[typing.Any], typing.Any]) \
         -> typing.Callable[[typing.Any], typing.Any]:
     """Return a function that will ensure a value is None or passes validator.
@@ -532,7 +552,7 @@ class BodhiConfig(dict):
             'validator': str},
         'pungi.extracmdline': {
             'value': [],
-            'validator': _generate_list_validator()},
+            'validator': _validate_cmdline},
         'pungi.labeltype': {
             'value': 'Update',
             'validator': str},
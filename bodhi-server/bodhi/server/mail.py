@@ -277,8 +277,36 @@ def get_template(update: 'Update', use_template: str = 'fedora_errata_template')
     Returns:
         A list of templates for the given update.
     """
+    return _render_template(update, read_template(use_template))
+
+
+def get_templates(updates: typing.Iterable['Update'],
+                  use_template: str = 'fedora_errata_template') -> typing.Dict['Update', list]:
+    """
+    Build the update notices for the given updates, reading the template only once.
+
+    Args:
+        updates: The updates to generate templates about.
+        use_template: The name of the variable in bodhi.server.mail that references the
+            template to generate the notices with.
+    Returns:
+        A mapping of each of the given updates to its list of templates.
+    """
+    template = read_template(use_template)
+    return {update: _render_template(update, template) for update in updates}
+
+
+def _render_template(update: 'Update', template: str) -> list:
+    """
+    Render the update notice for a given update with the given template text.
+
+    Args:
+        update: The update to generate a template about.
+        template: The template text, as returned by read_template().
+    Returns:
+        A list of templates for the given update.
+    """
     from bodhi.server.models import UpdateStatus, UpdateType
-    use_template = read_template(use_template)
     line = str('-' * 80) + '\n'
     templates = []
 
@@ -338,7 +366,7 @@ def get_template(update: 'Update', use_template: str = 'fedora_errata_template')
             info['changelog'] = "ChangeLog:\n\n%s%s" % \
                 (changelog, line)
 
-        templates.append((info['subject'], use_template % info))
+        templates.append((info['subject'], template % info))
 
     return templates
 
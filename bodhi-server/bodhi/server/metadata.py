@@ -105,7 +105,8 @@ class UpdateInfoMetadata(object):
     which is included in the `createrepo_c` package.
     """
 
-    def __init__(self, release, request, db, composedir, close_shelf=True):
+    def __init__(self, release, request, db, composedir, close_shelf=True,
+                 createrepo_c_settings=None):
         """
         Initialize the UpdateInfoMetadata object.
 
@@ -116,6 +117,8 @@ class UpdateInfoMetadata(object):
             composedir (str): A path to the composedir.
             close_shelf (bool): Whether to close the shelve, which is used to cache updateinfo
                 between composes.
+            createrepo_c_settings (munch.Munch or None): The createrepo_c settings for the release.
+                If None (the default), they are loaded with get_createrepo_config().
         """
         self.request = request
         if request is UpdateRequest.stable:
@@ -137,7 +140,8 @@ class UpdateInfoMetadata(object):
 
         self.uinfo = cr.UpdateInfo()
 
-        createrepo_c_settings = util.get_createrepo_config(release)
+        if createrepo_c_settings is None:
+            createrepo_c_settings = util.get_createrepo_config(release)
         self.comp_type = getattr(cr, createrepo_c_settings.uinfo_comp)
         self.zchunk = createrepo_c_settings.zchunk
 
@@ -787,7 +787,8 @@ class ComposeState(DeclEnum):
         success (EnumSymbol): The Compose has completed successfully.
         failed (EnumSymbol): The compose has failed, abandon hope.
         signing_repo (EnumSymbol): Waiting for the repo to be signed.
-        cleaning (EnumSymbol): Cleaning old Composes after successful completion.
+        cleaning (EnumSymbol): No longer entered, since old Composes are cleaned once after all
+            of them have finished. Kept for existing rows.
     """
 
     requested = 'requested', 'Requested'
@@ -4322,6 +4323,40 @@ class Compose(Base):
             release_id=compose['release_id'],
             request=UpdateRequest.from_string(compose['request'])).one()
 
+    @classmethod
+    def from_dicts(cls, db, composes, for_update=False):
+        """
+        Return the :class:`Compose` instances for the given dict representations in one query.
+
+        Args:
+            db (sqlalchemy.orm.session.Session): A database session to use to query for the
+                composes.
+            composes (list): A list of dictionaries representing composes, in the format returned
+                by :meth:`Compose.__json__`.
+            for_update (bool): If True, lock the rows of the composes until the end of the
+                transaction, so that no other transaction can change them in the meantime. Defaults
+                to False.
+        Returns:
+            list: The requested compose instances, in the same order as ``composes``.
+        Raises:
+            sqlalchemy.orm.exc.NoResultFound: If any of the requested composes does not exist.
+        """
+        keys = [(c['release_id'], UpdateRequest.from_string(c['request'])) for c in composes]
+        if not keys:
+            return []
+        query = db.query(cls).filter(
+            or_(*[and_(cls.release_id == release_id, cls.request == request)
+                  for release_id, request in set(keys)]))
+        if for_update:
+            # Lock the rows in a consistent order, so that two transactions locking overlapping
+            # sets of composes cannot deadlock each other.
+            query = query.order_by(cls.release_id, cls.request).with_for_update()
+        found = {(c.release_id, c.request): c for c in query}
+        missing = [key for key in keys if key not in found]
+        if missing:
+            raise NoResultFound('No compose found for {}'.format(missing))
+        return [found[key] for key in keys]
+
     @classmethod
     def from_updates(cls, updates):
         """
@@ -4358,7 +4393,7 @@ class Compose(Base):
                     raise ValueError(f'Builds of multiple types found in {update.alias}')
             # This key is just to insert things in the same place in the "work"
             # dict.
-            key = '%s-%s' % (update.release.name, update.request.value)
+            key = (update.release.name, update.request)
             if key not in work:
                 work[key] = cls(request=update.request, release_id=update.release.id,
                                 release=update.release)
@@ -4379,10 +4414,7 @@ class Compose(Base):
             bool: ``True`` if any of the :class:`Updates <Update>` in this compose are marked as
                 security updates.
         """
-        for update in self.updates:
-            if update.type is UpdateType.security:
-                return True
-        return False
+        return any(update.type is UpdateType.security for update in self.updates)
 
     @staticmethod
     def update_state_date(target, value, old, initiator):
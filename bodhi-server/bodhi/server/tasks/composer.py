@@ -23,6 +23,8 @@ comprised of a fedora messaging consumer that launches threads for each reposito
 composed.
 """
 
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from http.client import IncompleteRead
 from urllib.error import HTTPError, URLError
@@ -44,11 +46,12 @@ import sqlalchemy.orm.exc
 
 from bodhi.messages.schemas import compose as compose_schemas
 from bodhi.messages.schemas import update as update_schemas
-from bodhi.server import buildsys, mail, notifications
+from bodhi.server import bugs, buildsys, mail, notifications
 from bodhi.server.config import config, validate_path
 from bodhi.server.exceptions import BodhiException
 from bodhi.server.metadata import UpdateInfoMetadata
 from bodhi.server.models import (
+    BuildrootOverride,
     Compose,
     ComposeState,
     ContentType,
@@ -71,6 +74,29 @@ from bodhi.server.util import (
 
 log = logging.getLogger('bodhi')
 
+# Where Pungi puts the repodata and the packages of each arch, relative to the arch's directory in
+# the compose, and which type of repo its repodata is checked as. Source packages are laid out
+# differently from binary ones. A repo_type of None stands for the compose's own repo type.
+_ArchLayout = namedtuple('_ArchLayout', ['repodata', 'package_dirs', 'repo_type'])
+_SOURCE_ARCH_LAYOUT = _ArchLayout(
+    repodata=('tree', 'repodata'), package_dirs=(('tree', 'Packages'),), repo_type='source')
+_BINARY_ARCH_LAYOUT = _ArchLayout(
+    repodata=('os', 'repodata'), package_dirs=(('debug', 'tree', 'Packages'), ('os', 'Packages')),
+    repo_type=None)
+
+
+def _arch_layout(arch):
+    """
+    Return the layout of the given arch in a Pungi compose.
+
+    Args:
+        arch (str): The name of the arch's directory in the compose.
+    Returns:
+        _ArchLayout: The path parts of the arch's repodata directory and of each of its package
+            directories, and the type of repo to check the repodata as.
+    """
+    return _SOURCE_ARCH_LAYOUT if arch == 'source' else _BINARY_ARCH_LAYOUT
+
 
 def checkpoint(method):
     """
@@ -101,6 +127,27 @@ def checkpoint(method):
     return wrapper
 
 
+# The tails of a pungi process's stdout and stderr, the compose dirs it reported, and the threads
+# reading its output, as collected by PungiComposerThread._read_pungi_output().
+_PungiOutput = namedtuple('_PungiOutput', ['out', 'err', 'compose_dirs', 'readers'])
+
+
+def _log_stream(stream, name, on_line):
+    """
+    Log the lines of a child process's output stream as they arrive.
+
+    Args:
+        stream (io.BufferedReader): The stream to read until EOF.
+        name (str): The name of the stream, used in the log messages.
+        on_line (callable): Called with each decoded line, without its trailing newline.
+    """
+    for line in iter(stream.readline, b''):
+        # Never let undecodable output stop the reading, or the child would block on a full pipe.
+        line = line.decode(errors='replace').rstrip('\n')
+        log.debug('Pungi %s: %s', name, line)
+        on_line(line)
+
+
 class ComposerHandler(object):
     """
     The Bodhi Composer.
@@ -149,6 +196,8 @@ class ComposerHandler(object):
         - see if any updates now meet the stable criteria, and set the request
     """
 
+    keep_old_composes = 10
+
     def __init__(
             self, db_factory: typing.Union[transactional_session_maker, None] = None,
             compose_dir: str = config.get('compose_dir')):
@@ -224,6 +273,14 @@ class ComposerHandler(object):
             for result in thread.results():
                 results.append(result)
 
+        # All the composes share compose_dir, so clean it up once rather than from every thread.
+        if config['clean_old_composes'] and any(thread.success for thread in threads):
+            log.info('Cleaning old composes')
+            try:
+                clean_old_composes(self.keep_old_composes)
+            except Exception:
+                log.exception('Problem cleaning old composes')
+
         log.info('Push complete!  Summary follows:')
         for result in results:
             log.info(result)
@@ -247,7 +304,9 @@ class ComposerHandler(object):
         with self.db_factory() as db:
             if api_version == 2:
                 try:
-                    composes = [Compose.from_dict(db, c) for c in data['composes']]
+                    # Lock the composes' rows until their state is committed below, so that
+                    # two composers receiving the same message cannot both start the same compose.
+                    composes = Compose.from_dicts(db, data['composes'], for_update=True)
                 except sqlalchemy.orm.exc.NoResultFound:
                     # It is possible for messages to get into our queue that reference Composes that
                     # no longer exist. If this happens, we really just want to ignore the message so
@@ -292,7 +351,8 @@ class ComposerThread(threading.Thread):
     """The base class that defines common things for all composes."""
 
     ctype = None
-    keep_old_composes = 10
+    max_bug_workers = 16
+    max_sanity_check_workers = 4
 
     def __init__(self, max_concur_sem, compose, agent, db_factory, compose_dir, resume=False):
         """
@@ -323,6 +383,8 @@ class ComposerThread(threading.Thread):
         self.move_tags_sync = []
         self.testing_digest = {}
         self.success = False
+        self._saved_checkpoints = None
+        self._koji = None
 
     def run(self):
         """Run the thread by managing a db transaction and calling work()."""
@@ -334,6 +396,7 @@ class ComposerThread(threading.Thread):
                 self.db = session
                 self.compose = Compose.from_dict(session, self._compose)
                 self._checkpoints = json.loads(self.compose.checkpoints)
+                self._saved_checkpoints = self.compose.checkpoints
                 log.info('Starting composer type %s for %s with %d updates',
                          self, str(self.compose), len(self.compose.updates))
                 self.save_state(ComposeState.initializing)
@@ -349,9 +412,24 @@ class ComposerThread(threading.Thread):
         finally:
             self.compose = None
             self.db = None
+            self._koji = None
             self.max_concur_sem.release()
             log.info('Released semaphore')
 
+    def _get_koji_session(self):
+        """
+        Return the Koji session of this compose, logging in to Koji the first time it is needed.
+
+        Koji sessions keep their multicall state on the session, so each ComposerThread uses its
+        own, but reuses it for the whole compose instead of logging in again for each step.
+
+        Returns:
+            koji.ClientSession or bodhi.server.buildsys.DevBuildsys: The Koji session.
+        """
+        if self._koji is None:
+            self._koji = buildsys.get_session()
+        return self._koji
+
     def results(self):
         """
         Yield log string messages about the results of this compose run.
@@ -382,7 +460,7 @@ class ComposerThread(threading.Thread):
                  or self.compose.release.state is ReleaseState.frozen):
             self.skip_compose = True
 
-        log.info('Running ComposerThread(%s)' % self.id)
+        log.info('Running ComposerThread(%s)', self.id)
 
         notifications.publish(compose_schemas.ComposeComposingV1.from_dict(
             dict(repo=self.id,
@@ -431,18 +509,13 @@ class ComposerThread(threading.Thread):
             self.check_all_karma_thresholds()
             self.obsolete_older_updates()
 
-            if config['clean_old_composes']:
-                # Clean old composes
-                self.save_state(ComposeState.cleaning)
-                clean_old_composes(self.keep_old_composes)
-
             self.save_state(ComposeState.success)
             self.success = True
 
             self.remove_state()
 
         except Exception:
-            log.exception('Exception in ComposerThread(%s)' % self.id)
+            log.exception('Exception in ComposerThread(%s)', self.id)
             self.save_state()
             raise
         finally:
@@ -471,7 +544,7 @@ class ComposerThread(threading.Thread):
         for update in self.compose.updates:
             result, reason = update.meets_requirements_why
             if not result:
-                log.warning("%s failed gating: %s" % (update.alias, reason))
+                log.warning("%s failed gating: %s", update.alias, reason)
                 self.eject_from_compose(update, reason)
 
     def eject_from_compose(self, update, reason):
@@ -490,10 +563,10 @@ class ComposerThread(threading.Thread):
         # Remove the pending tag as well
         if update.request is UpdateRequest.stable:
             update.remove_tag(update.release.pending_stable_tag,
-                              koji=buildsys.get_session())
+                              koji=self._get_koji_session())
         elif update.request is UpdateRequest.testing:
             update.remove_tag(update.release.pending_testing_tag,
-                              koji=buildsys.get_session())
+                              koji=self._get_koji_session())
         update.request = None
         notifications.publish(
             update_schemas.UpdateEjectV1.from_dict(
@@ -520,10 +593,14 @@ class ComposerThread(threading.Thread):
             state (bodhi.server.models.ComposeState): If not ``None``, set the Compose's state
                 attribute to the given state. Defaults to ``None``.
         """
-        self.compose.checkpoints = json.dumps(self._checkpoints)
+        checkpoints = json.dumps(self._checkpoints)
+        # Avoid rewriting the checkpoints column if nothing has changed since the last save.
+        if checkpoints != self._saved_checkpoints:
+            self.compose.checkpoints = checkpoints
         if state is not None:
             self.compose.state = state
         self.db.commit()
+        self._saved_checkpoints = checkpoints
         log.info('Compose object updated.')
         # Expire the compose object so sqlalchemy will reload it instead of use its cached copy
         self.db.expire(self.compose)
@@ -546,7 +623,7 @@ class ComposerThread(threading.Thread):
         Args:
             success (bool): True if the compose had been successful, False otherwise.
         """
-        log.info('Thread(%s) finished.  Success: %r' % (self.id, success))
+        log.info('Thread(%s) finished.  Success: %r', self.id, success)
         notifications.publish(compose_schemas.ComposeCompleteV1.from_dict(dict(
             dict(success=success, repo=self.id, agent=self.agent, ctype=self.ctype.value))),
             force=True,
@@ -555,10 +632,39 @@ class ComposerThread(threading.Thread):
     def update_security_bugs(self):
         """Update the bug titles for security updates."""
         log.info('Updating bug titles for security updates')
-        for update in self.compose.updates:
-            if update.type is UpdateType.security:
-                for bug in update.bugs:
-                    bug.update_details()
+        security_bugs = [bug for update in self.compose.updates
+                         if update.type is UpdateType.security for bug in update.bugs]
+        if not security_bugs:
+            return
+
+        # Connect to Bugzilla before fanning out, so that the workers don't each log in on their
+        # own when the client has not been created yet.
+        bugs.bugtracker.connect()
+        # Fetching the bugs from Bugzilla is the slow part, so do it in parallel. The results are
+        # applied here afterwards, since the db session must not be shared between threads.
+        with ThreadPoolExecutor(max_workers=self.max_bug_workers) as executor:
+            bz_bugs = list(executor.map(self._fetch_bug, [bug.bug_id for bug in security_bugs]))
+        for bug, bz_bug in zip(security_bugs, bz_bugs):
+            if isinstance(bz_bug, Exception):
+                bugs.bugtracker.update_details_failed(bz_bug, bug)
+            else:
+                bug.update_details(bz_bug)
+
+    @staticmethod
+    def _fetch_bug(bug_id):
+        """
+        Retrieve a bug from the bug tracker.
+
+        Args:
+            bug_id (int): The id of the bug to retrieve.
+        Returns:
+            bugzilla.bug.Bug or Exception: The retrieved bug, or the exception raised while
+                retrieving it.
+        """
+        try:
+            return bugs.bugtracker.getbug(bug_id)
+        except Exception as e:
+            return e
 
     @checkpoint
     def determine_and_perform_tag_actions(self):
@@ -568,8 +674,12 @@ class ComposerThread(threading.Thread):
 
     def _determine_tag_actions(self):
         tag_types, tag_rels = Release.get_tags()
+        batches = sorted_updates(self.compose.updates)
+        build_tags = self._get_build_tags(
+            self._get_koji_session(),
+            [build for batch in batches for update in batch for build in update.builds])
         # sync & async tagging batches
-        for i, batch in enumerate(sorted_updates(self.compose.updates)):
+        for i, batch in enumerate(batches):
             for update in batch:
                 add_tags = []
                 move_tags = []
@@ -581,7 +691,7 @@ class ComposerThread(threading.Thread):
 
                 for build in update.builds:
                     from_tag = None
-                    tags = build.get_tags()
+                    tags = build_tags[build.nvr]
                     for tag in tags:
                         if tag in tag_types[status]:
                             from_tag = tag
@@ -605,8 +715,35 @@ class ComposerThread(threading.Thread):
                         self.add_tags_async.extend(add_tags)
                         self.move_tags_async.extend(move_tags)
 
+    @staticmethod
+    def _get_build_tags(koji, builds):
+        """
+        Return the Koji tags of the given builds, retrieved with a single multicall.
+
+        Args:
+            koji (koji.ClientSession): The Koji session to use.
+            builds (list): The :class:`Builds <bodhi.server.models.Build>` to get the tags of.
+        Returns:
+            dict: A mapping of each build's nvr to a list of the names of its Koji tags.
+        Raises:
+            Exception: If Koji returned an error for any of the builds.
+        """
+        koji.multicall = True
+        for build in builds:
+            koji.listTags(build.nvr)
+        results = koji.multiCall()
+
+        build_tags = {}
+        for build, result in zip(builds, results):
+            if not isinstance(result, list):
+                err = 'Unable to list the tags of %s: %r' % (build.nvr, result)
+                log.error(err)
+                raise Exception(err)
+            build_tags[build.nvr] = [tag['name'] for tag in result[0]]
+        return build_tags
+
     def _perform_tag_actions(self):
-        koji = buildsys.get_session()
+        koji = self._get_koji_session()
         for i, batches in enumerate([(self.add_tags_sync, self.move_tags_sync),
                                      (self.add_tags_async, self.move_tags_async)]):
             add, move = batches
@@ -616,11 +753,11 @@ class ComposerThread(threading.Thread):
                 koji.multicall = True
             for action in add:
                 tag, build = action
-                log.info("Adding tag %s to %s" % (tag, build))
+                log.info("Adding tag %s to %s", tag, build)
                 koji.tagBuild(tag, build, force=True)
             for action in move:
                 from_tag, to_tag, build = action
-                log.info('Moving %s from %s to %s' % (build, from_tag, to_tag))
+                log.info('Moving %s from %s to %s', build, from_tag, to_tag)
                 koji.moveBuild(from_tag, to_tag, build, force=True)
 
             if i != 0:
@@ -632,20 +769,26 @@ class ComposerThread(threading.Thread):
 
     def expire_buildroot_overrides(self):
         """Expire any buildroot overrides that are in this push."""
-        for update in self.compose.updates:
-            if update.request is UpdateRequest.stable:
-                for build in update.builds:
-                    if build.override:
-                        try:
-                            log.debug(f"Expiring BRO for {build.nvr} because it is being pushed.")
-                            build.override.expire()
-                        except Exception:
-                            log.exception('Problem expiring override')
+        build_ids = [build.id for update in self.compose.updates
+                     if update.request is UpdateRequest.stable for build in update.builds]
+        if not build_ids:
+            return
+        # Find all the active overrides with a single query, rather than loading the override of
+        # each build separately.
+        overrides = self.db.query(BuildrootOverride).filter(
+            BuildrootOverride.build_id.in_(build_ids),
+            BuildrootOverride.expired_date.is_(None))
+        for override in overrides:
+            try:
+                log.debug("Expiring BRO for %s because it is being pushed.", override.build.nvr)
+                override.expire()
+            except Exception:
+                log.exception('Problem expiring override')
 
     def remove_pending_tags(self):
         """Remove all pending tags from the updates."""
         log.debug("Removing pending tags from builds")
-        koji = buildsys.get_session()
+        koji = self._get_koji_session()
         koji.multicall = True
         for update in self.compose.updates:
             if update.request is UpdateRequest.stable:
@@ -679,7 +822,7 @@ class ComposerThread(threading.Thread):
             update.pushed = True
 
         log.info('Deleting EOL side-tags.')
-        koji = buildsys.get_session()
+        koji = self._get_koji_session()
         koji.multicall = True
         for sidetag in eol_sidetags:
             koji.deleteTag(sidetag)
@@ -688,32 +831,37 @@ class ComposerThread(threading.Thread):
     def _unlock_updates(self):
         """Unlock all the updates and clear their requests."""
         log.info("Unlocking updates.")
-        for update in self.compose.updates:
-            update.request = None
-            update.locked = False
+        # Unlock all the updates with a single UPDATE statement. The 'fetch' synchronization also
+        # sets the new values on the Update objects in the session, which are used after this.
+        self.db.query(Update).filter(
+            Update.id.in_([update.id for update in self.compose.updates])).update(
+                {Update.request: None, Update.locked: False}, synchronize_session='fetch')
 
-    def add_to_digest(self, update):
+    def add_to_digest(self, update, templates):
         """Add an package to the digest dictionary.
 
         {'release-id': {'build nvr': body text for build, ...}}
 
         Args:
             update (bodhi.server.models.Update): The update to add to the dict.
+            templates (list): The update's (subject, body) maillist templates, one per build, as
+                returned by :func:`bodhi.server.mail.get_templates`.
         """
         prefix = update.release.long_name
         if prefix not in self.testing_digest:
             self.testing_digest[prefix] = {}
-        for i, subbody in enumerate(mail.get_template(
-                update, use_template='maillist_template')):
-            self.testing_digest[prefix][update.builds[i].nvr] = subbody[1]
+        for build, subbody in zip(update.builds, templates):
+            self.testing_digest[prefix][build.nvr] = subbody[1]
 
     def generate_testing_digest(self):
         """Generate a testing digest message for this release."""
-        log.info('Generating testing digest for %s' % self.compose.release.name)
-        for update in self.compose.updates:
-            if update.request is UpdateRequest.testing:
-                self.add_to_digest(update)
-        log.info('Testing digest generation for %s complete' % self.compose.release.name)
+        log.info('Generating testing digest for %s', self.compose.release.name)
+        testing_updates = [update for update in self.compose.updates
+                           if update.request is UpdateRequest.testing]
+        templates = mail.get_templates(testing_updates, use_template='maillist_template')
+        for update in testing_updates:
+            self.add_to_digest(update, templates[update])
+        log.info('Testing digest generation for %s complete', self.compose.release.name)
 
     def send_notifications(self):
         """Send messages to announce completion of composing for each update."""
@@ -771,7 +919,7 @@ class ComposerThread(threading.Thread):
                             test_list_key)
                 continue
 
-            log.debug("Sending digest for updates-testing %s" % prefix)
+            log.debug("Sending digest for updates-testing %s", prefix)
             maildata = ''
             security_updates = self.get_security_updates(prefix)
             if security_updates:
@@ -897,6 +1045,8 @@ class PungiComposerThread(ComposerThread):
     """Compose update with Pungi."""
 
     pungi_template_config_key = None
+    pungi_output_lines = 200
+    pungi_startup_timeout = 3
 
     def __init__(self, max_concur_sem, compose, agent, db_factory, compose_dir, resume=False):
         """
@@ -919,6 +1069,8 @@ class PungiComposerThread(ComposerThread):
                                                   compose_dir, resume)
         self.compose_dir = compose_dir
         self.path = None
+        self._createrepo_config = None
+        self._pungi_output = None
 
     def finish(self, success):
         """
@@ -939,15 +1091,16 @@ class PungiComposerThread(ComposerThread):
         super(PungiComposerThread, self).load_state()
         if 'completed_repo' in self._checkpoints:
             self.path = self._checkpoints['completed_repo']
-            log.info('Resuming push with completed repo: %s' % self.path)
+            log.info('Resuming push with completed repo: %s', self.path)
             return
         log.info('Resuming push without any completed repos')
 
     def _compose_updates(self):
         """Start pungi, generate updateinfo, wait for pungi, and wait for the mirrors."""
         if not os.path.exists(self.compose_dir):
-            log.info('Creating %s' % self.compose_dir)
-            os.makedirs(self.compose_dir)
+            log.info('Creating %s', self.compose_dir)
+            # Other compose threads may be creating it at the same time.
+            os.makedirs(self.compose_dir, exist_ok=True)
 
         composedone = self._checkpoints.get('compose_done')
 
@@ -992,7 +1145,7 @@ class PungiComposerThread(ComposerThread):
     def _create_pungi_config(self):
         """Create a temp dir and render the Pungi config templates into the dir."""
         loader = jinja2.FileSystemLoader(searchpath=config.get('pungi.basepath'))
-        createrepo_c_settings = get_createrepo_config(self.compose.release)
+        createrepo_c_settings = self._get_createrepo_config()
         env = jinja2.Environment(loader=loader,
                                  autoescape=False,
                                  block_start_string='[%',
@@ -1018,6 +1171,19 @@ class PungiComposerThread(ComposerThread):
 
         self._copy_additional_pungi_files(self._pungi_conf_dir, env)
 
+    def _get_createrepo_config(self):
+        """
+        Return the createrepo_c settings for the release being composed.
+
+        The settings file is only read the first time this is called during the compose.
+
+        Returns:
+            munch.Munch: The createrepo_c settings, as returned by get_createrepo_config().
+        """
+        if self._createrepo_config is None:
+            self._createrepo_config = get_createrepo_config(self.compose.release)
+        return self._createrepo_config
+
     def _generate_updateinfo(self):
         """
         Create the updateinfo.xml file for this repository.
@@ -1026,11 +1192,12 @@ class PungiComposerThread(ComposerThread):
             bodhi.server.metadata.UpdateInfoMetadata: The updateinfo model that was created for this
                 repository.
         """
-        log.info('Generating updateinfo for %s' % self.compose.release.name)
+        log.info('Generating updateinfo for %s', self.compose.release.name)
         self.save_state(ComposeState.updateinfo)
         uinfo = UpdateInfoMetadata(self.compose.release, self.compose.request,
-                                   self.db, self.compose_dir)
-        log.info('Updateinfo generation for %s complete' % self.compose.release.name)
+                                   self.db, self.compose_dir,
+                                   createrepo_c_settings=self._get_createrepo_config())
+        log.info('Updateinfo generation for %s complete', self.compose.release.name)
         return uinfo
 
     def _get_master_repomd_url(self, arch):
@@ -1080,7 +1247,8 @@ class PungiComposerThread(ComposerThread):
         Returns:
             subprocess.Popen: A process handle to the child Pungi process.
         Raises:
-            Exception: If the child Pungi process exited with a non-0 exit code within 3 seconds.
+            Exception: If the child Pungi process exited with a non-0 exit code within
+                pungi_startup_timeout seconds.
         """
         if self.path:
             log.info('Skipping completed repo: %s', self.path)
@@ -1114,17 +1282,55 @@ class PungiComposerThread(ComposerThread):
                                            # We will never have additional input
                                            stdin=subprocess.DEVNULL)
         log.info('Pungi running as PID: %s', compose_process.pid)
-        # Since the compose process takes a long time, we can safely just wait 3 seconds
-        # to abort the entire compose early if Pungi fails to start up correctly.
-        time.sleep(3)
-        if compose_process.poll() not in [0, None]:
-            log.error('Pungi process terminated with error within 3 seconds! Abandoning!')
-            _, err = compose_process.communicate()
-            log.error('Stderr: %s', err)
+        self._read_pungi_output(compose_process)
+        # Since the compose process takes a long time, we can safely wait a few seconds to abort
+        # the entire compose early if Pungi fails to start up correctly. Waiting on the process
+        # rather than sleeping lets us bail out as soon as a failing Pungi exits.
+        try:
+            compose_process.wait(timeout=self.pungi_startup_timeout)
+        except subprocess.TimeoutExpired:
+            pass
+        if compose_process.returncode not in [0, None]:
+            log.error('Pungi process terminated with error within %s seconds! Abandoning!',
+                      self.pungi_startup_timeout)
+            for reader in self._pungi_output.readers:
+                reader.join()
+            log.error('Stderr: %s', '\n'.join(self._pungi_output.err))
             raise Exception('Pungi returned error, aborting!')
 
         return compose_process
 
+    def _read_pungi_output(self, pungi_process):
+        """
+        Start logging the output of the given pungi process in background threads.
+
+        Pungi stops once the buffer of its stdout or stderr pipe is full, so its output is read from
+        the moment it starts. This lets it keep composing while the testing digest and the
+        updateinfo are generated. Only the tail of the output is kept for error reporting.
+
+        Args:
+            pungi_process (subprocess.Popen): The Popen handle of the running child process.
+        """
+        out = deque(maxlen=self.pungi_output_lines)
+        err = deque(maxlen=self.pungi_output_lines)
+        compose_dirs = []
+        prefix = 'Compose dir: '
+
+        def on_stdout(line):
+            out.append(line)
+            # Find the path Pungi just created
+            if line.startswith(prefix):
+                compose_dirs.append(line[len(prefix):])
+
+        readers = [
+            threading.Thread(target=_log_stream, args=(pungi_process.stdout, 'stdout', on_stdout),
+                             daemon=True),
+            threading.Thread(target=_log_stream, args=(pungi_process.stderr, 'stderr', err.append),
+                             daemon=True)]
+        for reader in readers:
+            reader.start()
+        self._pungi_output = _PungiOutput(out, err, compose_dirs, readers)
+
     def _toss_out_repo(self):
         """Remove a repo from the completed_repo checkpoint.
 
@@ -1144,7 +1350,7 @@ class PungiComposerThread(ComposerThread):
         This means that we when we go and sync generated repositories out, we do not need to take
         special case to copy the target files rather than symlinks.
         """
-        log.info("Running sanity checks on %s" % self.path)
+        log.info("Running sanity checks on %s", self.path)
 
         try:
             arches = os.listdir(os.path.join(self.path, 'compose', 'Everything'))
@@ -1158,53 +1364,58 @@ class PungiComposerThread(ComposerThread):
             self._toss_out_repo()
             raise Exception('Empty compose found')
 
+        # sanity check our repodata
+        repo_type = 'module' if self.ctype == ContentType.module else 'yum'
+        # for module repos drpms is not considered
+        drpms = self._get_createrepo_config().get('drpms_enabled')
+        checks = []
         for arch in arches:
-            # sanity check our repodata
+            layout = _arch_layout(arch)
+            repodata = os.path.join(self.path, 'compose', 'Everything', arch, *layout.repodata)
+            if layout.repo_type is None:
+                checks.append((repodata, repo_type, drpms))
+            else:
+                checks.append((repodata, layout.repo_type, False))
+        # The checks are independent of each other, so run them for the arches in parallel. Each
+        # one runs dnf against the repodata, so only a few of them run at the same time.
+        workers = min(len(checks), self.max_sanity_check_workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(sanity_check_repodata, *check) for check in checks]
+        for arch, check, future in zip(arches, checks, futures):
             try:
-                if arch == 'source':
-                    repodata = os.path.join(self.path, 'compose',
-                                            'Everything', arch, 'tree', 'repodata')
-                    sanity_check_repodata(repodata, repo_type='source', drpms=False)
-                else:
-                    repodata = os.path.join(self.path, 'compose',
-                                            'Everything', arch, 'os', 'repodata')
-                    repo_type = 'module' if self.ctype == ContentType.module else 'yum'
-                    drpms = get_createrepo_config(self.compose.release).get('drpms_enabled')
-                    # for module repos drpms is not considered
-                    sanity_check_repodata(repodata, repo_type=repo_type, drpms=drpms)
+                future.result()
             except Exception:
-                log.exception("Repodata sanity check failed, compose thrown out")
+                log.exception("Repodata sanity check failed for %s at %s, compose thrown out",
+                              arch, check[0])
                 self._toss_out_repo()
                 raise
 
+        for arch in arches:
             # make sure that pungi didn't symlink our packages
             try:
-                if arch == 'source':
-                    dirs = [('tree', 'Packages')]
-                else:
-                    dirs = [('debug', 'tree', 'Packages'), ('os', 'Packages')]
-
                 # Example of full path we are checking:
                 # self.path/compose/Everything/os/Packages/s/something.rpm
-                for checkdir in dirs:
+                for checkdir in _arch_layout(arch).package_dirs:
                     checkdir = os.path.join(self.path, 'compose', 'Everything', arch, *checkdir)
-                    subdirs = os.listdir(checkdir)
                     # subdirs is the self.path/compose/Everything/os/Packages/{a,b,c,...}/ dirs
                     #
                     # Let's check the first file in each subdir. If they are correct, we'll assume
                     # the rest is correct
                     # This is to avoid tons and tons of IOPS for a bunch of files put in in the
-                    # same way
-                    for subdir in subdirs:
-                        for checkfile in os.listdir(os.path.join(checkdir, subdir)):
-                            if not checkfile.endswith('.rpm'):
-                                continue
-                            if os.path.islink(os.path.join(checkdir, subdir, checkfile)):
-                                log.error('Pungi out directory contains at least one '
-                                          'symlink at %s', checkfile)
-                                raise Exception('Symlinks found')
-                            # We have checked the first rpm in the subdir
-                            break
+                    # same way. scandir() gives us the file type along with the name, so no extra
+                    # lstat() is needed to find out if the file is a symlink.
+                    with os.scandir(checkdir) as subdirs:
+                        for subdir in subdirs:
+                            with os.scandir(subdir.path) as checkfiles:
+                                for checkfile in checkfiles:
+                                    if not checkfile.name.endswith('.rpm'):
+                                        continue
+                                    if checkfile.is_symlink():
+                                        log.error('Pungi out directory contains at least one '
+                                                  'symlink at %s', checkfile.name)
+                                        raise Exception('Symlinks found')
+                                    # We have checked the first rpm in the subdir
+                                    break
             except Exception:
                 log.exception('Unable to check pungi composed repositories, compose thrown out')
                 self._toss_out_repo()
@@ -1217,12 +1428,17 @@ class PungiComposerThread(ComposerThread):
         stage_dir = config.get('compose_stage_dir')
         if not os.path.isdir(stage_dir):
             log.info('Creating compose_stage_dir %s', stage_dir)
-            os.mkdir(stage_dir)
+            os.makedirs(stage_dir, exist_ok=True)
         link = os.path.join(stage_dir, self.id)
-        if os.path.islink(link):
-            os.unlink(link)
-        log.info("Creating symlink: %s => %s" % (link, self.path))
-        os.symlink(self.path, link)
+        log.info("Creating symlink: %s => %s", link, self.path)
+        # Create the new symlink next to the old one and rename it over the old one, so that the
+        # link is replaced atomically and there is no window in which it does not exist.
+        new_link = '%s.new' % link
+        if os.path.lexists(new_link):
+            # Left over from an interrupted compose.
+            os.unlink(new_link)
+        os.symlink(self.path, new_link)
+        os.replace(new_link, link)
 
     def _wait_for_pungi(self, pungi_process):
         """
@@ -1239,23 +1455,24 @@ class PungiComposerThread(ComposerThread):
             log.info('Not waiting for pungi process, as there was no pungi')
             return
         log.info('Waiting for pungi process to finish')
-        out, err = pungi_process.communicate()
-        out = out.decode()
-        err = err.decode()
+        if self._pungi_output is None:
+            self._read_pungi_output(pungi_process)
+        output = self._pungi_output
+        pungi_process.wait()
+        for reader in output.readers:
+            reader.join()
+
         if pungi_process.returncode != 0:
             log.error('Pungi exited with exit code %d', pungi_process.returncode)
-            log.error('Stderr: %s', err)
+            log.error('Stderr: %s', '\n'.join(output.err))
             raise Exception('Pungi exited with status %d' % pungi_process.returncode)
         else:
             log.info('Pungi finished')
 
-        # Find the path Pungi just created
-        prefix = 'Compose dir: '
-        for line in out.split('\n'):
-            if line.startswith(prefix):
-                self.path = line[len(prefix):]
+        if output.compose_dirs:
+            self.path = output.compose_dirs[-1]
         if not self.path:
-            log.error('Stdout: %s', out)
+            log.error('Stdout: %s', '\n'.join(output.out))
             raise Exception('Unable to find the path to the compose')
         if not os.path.exists(os.path.join(self.path, 'compose', 'metadata', 'composeinfo.json')):
             raise Exception('Directory at %s does not look like a compose' % self.path)
@@ -1275,12 +1492,8 @@ class PungiComposerThread(ComposerThread):
             sigpaths = []
             repopath = os.path.join(self.path, 'compose', 'Everything')
             for arch in os.listdir(repopath):
-                if arch == 'source':
-                    sigpaths.append(os.path.join(repopath, arch, 'tree', 'repodata',
-                                                 'repomd.xml.asc'))
-                else:
-                    sigpaths.append(os.path.join(repopath, arch, 'os', 'repodata',
-                                                 'repomd.xml.asc'))
+                sigpaths.append(os.path.join(repopath, arch, *_arch_layout(arch).repodata,
+                                             'repomd.xml.asc'))
 
             log.info('Waiting for signatures in %s', ', '.join(sigpaths))
             while True:
@@ -1319,7 +1532,7 @@ class PungiComposerThread(ComposerThread):
         if not checkarch:
             raise Exception('Not found an arch to _wait_for_sync with')
 
-        repomd = os.path.join(compose_path, arch, 'os', 'repodata', 'repomd.xml')
+        repomd = os.path.join(compose_path, arch, *_arch_layout(arch).repodata, 'repomd.xml')
         if not os.path.exists(repomd):
             log.error('Cannot find local repomd: %s', repomd)
             return
@@ -1331,7 +1544,7 @@ class PungiComposerThread(ComposerThread):
             checksum = hashlib.sha1(repomdf.read().encode('utf-8')).hexdigest()
         while True:
             try:
-                log.info('Polling %s' % master_repomd_url)
+                log.info('Polling %s', master_repomd_url)
                 masterrepomd = urlopen(master_repomd_url)
                 newsum = hashlib.sha1(masterrepomd.read()).hexdigest()
             except (ConnectionResetError, IncompleteRead, URLError, HTTPError):
@@ -1488,7 +1701,7 @@ class ModuleComposerThread(PungiComposerThread):
         # impossible to distinguish between name and version from "nvr". We
         # therefore have to ask for Koji build here and get that information
         # from there.
-        koji = buildsys.get_session()
+        koji = self._get_koji_session()
         koji.multicall = True
         for build in self.compose.release.builds:
             koji.getBuild(build.nvr)
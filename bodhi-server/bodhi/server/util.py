@@ -778,23 +778,24 @@ def sorted_updates(updates):
             with a multicall.
     """
     builds = defaultdict(set)
-    sync, async_ = [], []
+    # These dicts are used as insertion ordered sets, so membership tests and removals don't have
+    # to scan the lists of updates.
+    sync, async_ = {}, {}
     for update in updates:
         for build in update.builds:
             builds[build.nvr_name].add(build)
     # The sorted here is so we actually have a way to test this
     # Otherwise, we would be depending on the way Python orders dict keys
-    for package in sorted(builds.keys()):
-        if len(builds[package]) > 1:
-            for build in sorted_builds(builds[package])[::-1]:
-                if build.update not in sync:
-                    sync.append(build.update)
-                if build.update in async_:
-                    async_.remove(build.update)
+    for package, package_builds in sorted(builds.items()):
+        if len(package_builds) > 1:
+            for build in sorted_builds(package_builds)[::-1]:
+                sync.setdefault(build.update)
+                async_.pop(build.update, None)
         else:
-            build = list(builds[package])[0]
-            if build.update not in async_ and build.update not in sync:
-                async_.append(build.update)
+            build = next(iter(package_builds))
+            if build.update not in sync:
+                async_.setdefault(build.update)
+    sync, async_ = list(sync), list(async_)
     log.info('sync = %s', [up.alias for up in sync])
     log.info('async_ = %s', [up.alias for up in async_])
     if not (len(set(sync) & set(async_)) == 0 and len(set(sync) | set(async_)) == len(updates)):
@@ -1170,11 +1171,10 @@ def copy_container(build, destination_registry=None, destination_tag=None):
     destination_url = _container_image_url(destination_registry, repository,
                                            tag=make_valid_container_tag(destination_tag))
 
-    skopeo_cmd = [
-        config.get('skopeo.cmd'), 'copy', source_url, destination_url]
+    skopeo_cmd = [config.get('skopeo.cmd'), 'copy']
     if config.get('skopeo.extra_copy_flags'):
-        for flag in reversed(config.get('skopeo.extra_copy_flags').split(',')):
-            skopeo_cmd.insert(2, flag)
+        skopeo_cmd.extend(config.get('skopeo.extra_copy_flags').split(','))
+    skopeo_cmd.extend([source_url, destination_url])
     cmd(skopeo_cmd, raise_on_error=True)
 
 
@@ -15,18 +15,22 @@
 # You should have received a copy of the GNU General Public License
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+from concurrent.futures import ThreadPoolExecutor
 import hashlib
 from http.client import IncompleteRead
 from unittest import mock
 from urllib.error import HTTPError, URLError
 from datetime import datetime, timedelta, timezone
 import errno
+import io
 import json
 import os
 import shutil
+import subprocess
 import tempfile
 import time
 import urllib.parse as urlparse
+import xmlrpc.client
 
 from click import testing
 from fedora_messaging import api
@@ -38,7 +42,7 @@ from bodhi.messages.schemas import buildroot_override as override_schemas
 from bodhi.messages.schemas import compose as compose_schemas
 from bodhi.messages.schemas import errata as errata_schemas
 from bodhi.messages.schemas import update as update_schemas
-from bodhi.server import buildsys, exceptions, log, push
+from bodhi.server import bugs, buildsys, exceptions, log, push
 from bodhi.server.config import config
 from bodhi.server.exceptions import LockedUpdateException
 from bodhi.server.models import (
@@ -73,6 +77,7 @@ from bodhi.server.tasks.composer import (
     PungiComposerThread,
     RPMComposerThread,
 )
+from bodhi.server.util import get_createrepo_config
 
 from .. import base
 
@@ -291,7 +296,8 @@ Compose dir: %s
 That was the actual one''' % compose_dir
 
             fake_popen = mock.MagicMock()
-            fake_popen.communicate = lambda: (fake_stdout.encode(), b'hello')
+            fake_popen.stdout = io.BytesIO(fake_stdout.encode())
+            fake_popen.stderr = io.BytesIO(b'hello')
             fake_popen.poll.return_value = None
             fake_popen.returncode = 0
             return fake_popen
@@ -340,6 +346,52 @@ That was the actual one''' % compose_dir
         assert m.db_factory == transactional_session_maker.return_value
         transactional_session_maker.assert_called_once_with()
 
+    @mock.patch('bodhi.server.tasks.composer.clean_old_composes')
+    @mock.patch('bodhi.server.tasks.composer.get_composer')
+    @mock.patch.object(ComposerHandler, '_get_composes')
+    @pytest.mark.parametrize('clean_old, success, cleaned', (
+        (True, (True, False), True), (True, (False, False), False), (False, (True, True), False)))
+    def test_run_clean_old_composes(self, _get_composes, get_composer, clean_old_composes,
+                                    clean_old, success, cleaned):
+        """run() should clean old composes once, after all the threads have finished."""
+        config["clean_old_composes"] = clean_old
+        _get_composes.return_value = [{'content_type': 'rpm'}, {'content_type': 'module'}]
+        threads = [mock.MagicMock(success=s) for s in success]
+        for thread in threads:
+            thread.results.return_value = []
+        get_composer.return_value.side_effect = threads
+
+        with mock_sends(compose_schemas.ComposeStartV1):
+            self.handler.run(2, {'composes': [], 'agent': 'bowlofeggs'})
+
+        for thread in threads:
+            thread.join.assert_called_once_with()
+        if cleaned:
+            clean_old_composes.assert_called_once_with(ComposerHandler.keep_old_composes)
+        else:
+            clean_old_composes.assert_not_called()
+
+    @mock.patch('bodhi.server.tasks.composer.log')
+    @mock.patch('bodhi.server.tasks.composer.clean_old_composes')
+    @mock.patch('bodhi.server.tasks.composer.get_composer')
+    @mock.patch.object(ComposerHandler, '_get_composes')
+    def test_run_clean_old_composes_failure(self, _get_composes, get_composer, clean_old_composes,
+                                            mocked_log):
+        """A failure to clean old composes should be logged without failing the run."""
+        config["clean_old_composes"] = True
+        _get_composes.return_value = [{'content_type': 'rpm'}]
+        thread = mock.MagicMock(success=True)
+        thread.results.return_value = ['result']
+        get_composer.return_value.return_value = thread
+        clean_old_composes.side_effect = OSError('oh no')
+
+        with mock_sends(compose_schemas.ComposeStartV1):
+            self.handler.run(2, {'composes': [], 'agent': 'bowlofeggs'})
+
+        mocked_log.exception.assert_called_once_with('Problem cleaning old composes')
+        assert mocked_log.info.mock_calls[-2:] == [
+            mock.call('Push complete!  Summary follows:'), mock.call('result')]
+
     def test__get_composes_api_2(self):
         """Test _get_composes() with API version 2."""
         task = self._make_task()
@@ -690,7 +742,8 @@ References:
 Some more output ...... This is not a Compose dir: ....
 Compose dir: /tmp/nonsensical_directory
 That was the actual one'''
-                fake_popen.communicate = lambda: (fake_stdout, b'hello')
+                fake_popen.stdout = io.BytesIO(fake_stdout)
+                fake_popen.stderr = io.BytesIO(b'hello')
                 fake_popen.poll.return_value = None
                 fake_popen.returncode = 0
                 t._startyear = datetime.now(timezone.utc).year
@@ -717,7 +770,8 @@ That was the actual one'''
                 fake_stdout = b'''Some output
     Some more output ...... This is not a Compose dir: ....
     That was the actual one'''
-                fake_popen.communicate = lambda: (fake_stdout, b'hello')
+                fake_popen.stdout = io.BytesIO(fake_stdout)
+                fake_popen.stderr = io.BytesIO(b'hello')
                 fake_popen.poll.return_value = None
                 fake_popen.returncode = 0
                 t._startyear = datetime.now(timezone.utc).year
@@ -815,6 +869,40 @@ That was the actual one'''
         assert 'completed_repo' in t._checkpoints
         save_state.assert_not_called()
 
+    @mock.patch('bodhi.server.tasks.composer.ComposerThread.save_state')
+    @mock.patch('bodhi.server.tasks.composer.sanity_check_repodata')
+    def test_sanity_check_repodata_all_arches(self, sanity_check_repodata, save_state):
+        """The repodata of every arch should be checked."""
+        task = self._make_task()
+        t = RPMComposerThread(self.semmock, task['composes'][0],
+                              'ralph', self.db_factory, self.tempdir)
+        t.id = 'f17-updates-testing'
+        t.max_sanity_check_workers = 2
+        with self.db_factory() as session:
+            t.db = session
+            t.compose = session.query(Compose).one()
+            t._checkpoints = {}
+            t._wait_for_pungi(self._generate_fake_pungi(t, 'testing_tag', t.compose.release)())
+
+            with mock.patch('bodhi.server.tasks.composer.ThreadPoolExecutor',
+                            wraps=ThreadPoolExecutor) as executor:
+                t._sanity_check_repo()
+            # The four arches should be checked by no more than the configured number of workers.
+            executor.assert_called_once_with(max_workers=2)
+
+            drpms = get_createrepo_config(t.compose.release).get('drpms_enabled')
+            t.db = None
+
+        everything = os.path.join(t.path, 'compose', 'Everything')
+        expected_calls = [
+            mock.call(os.path.join(everything, arch, 'os', 'repodata'), 'yum', drpms)
+            for arch in ('i386', 'x86_64', 'armhfp')]
+        expected_calls.append(
+            mock.call(os.path.join(everything, 'source', 'tree', 'repodata'), 'source', False))
+        sanity_check_repodata.assert_has_calls(expected_calls, any_order=True)
+        assert sanity_check_repodata.call_count == 4
+        assert 'completed_repo' in t._checkpoints
+
     @mock.patch('bodhi.server.tasks.composer.ComposerThread.save_state')
     def test_sanity_check_broken_repodata(self, save_state):
         task = self._make_task()
@@ -846,10 +934,15 @@ That was the actual one'''
         save_state.assert_called_once_with(ComposeState.punging)
         assert 'completed_repo' in t._checkpoints
         save_state.reset_mock()
-        with pytest.raises(exceptions.RepodataException):
-            t._sanity_check_repo()
+        with mock.patch('bodhi.server.tasks.composer.log.exception') as exception:
+            with pytest.raises(exceptions.RepodataException):
+                t._sanity_check_repo()
         assert 'completed_repo' not in t._checkpoints
         save_state.assert_called()
+        arch = exception.mock_calls[0][1][1]
+        assert exception.mock_calls[0] == mock.call(
+            'Repodata sanity check failed for %s at %s, compose thrown out', arch,
+            os.path.join(t.path, 'compose', 'Everything', arch, 'os', 'repodata'))
 
     @mock.patch('bodhi.server.tasks.composer.ComposerThread.save_state')
     def test_sanity_check_symlink(self, save_state):
@@ -1215,14 +1308,11 @@ That was the actual one'''
         task = self._make_task()
         t = RPMComposerThread(self.semmock, task['composes'][0],
                               'ralph', self.db_factory, self.tempdir)
-        real_sleep = time.sleep
 
-        # We want it to run long enough to finish the call to /usr/bin/false, which can take a bit
-        # on a heavily loaded system (such as the CI system running all tests in parallel), but not
-        # the full 3 seconds because that's a waste of time.
-        with mock.patch('bodhi.server.tasks.composer.time.sleep', lambda x: real_sleep(0.125)):
-            with mock_sends(*[base_schemas.BodhiMessage] * 3):
-                t.run()
+        # The startup check returns as soon as /usr/bin/false exits, so this doesn't take the full
+        # startup timeout.
+        with mock_sends(*[base_schemas.BodhiMessage] * 3):
+            t.run()
 
         assert not t.success
         with self.db_factory() as db:
@@ -1245,6 +1335,8 @@ That was the actual one'''
         task = self._make_task()
         t = RPMComposerThread(self.semmock, task['composes'][0],
                               'ralph', self.db_factory, self.tempdir)
+        # Don't wait for the script to exit during the startup check.
+        t.pungi_startup_timeout = 0
 
         with self.db_factory() as session:
             with tempfile.NamedTemporaryFile(delete=False) as script:
@@ -1267,11 +1359,10 @@ That was the actual one'''
     @mock.patch('bodhi.server.tasks.composer.PungiComposerThread._wait_for_repo_signature')
     @mock.patch('bodhi.server.tasks.composer.PungiComposerThread._wait_for_sync')
     @mock.patch('bodhi.server.tasks.composer.time.sleep')
-    @pytest.mark.parametrize('clean_old', (False, True))
-    def test_clean_old_composes_param(self, sleep, wfs, wfrs, stage, scr, clean_old):
-        """Test work() with clean_old_composes set to False or True."""
+    def test_work_leaves_old_composes(self, sleep, wfs, wfrs, stage, scr):
+        """work() should leave cleaning old composes to the ComposerHandler."""
         self.expected_sems = 1
-        config["clean_old_composes"] = clean_old
+        config["clean_old_composes"] = True
 
         # Set the request to stable right out the gate so we can test gating
         self.set_stable_request('bodhi-2.0-1.fc17')
@@ -1304,7 +1395,6 @@ That was the actual one'''
 
         t = RPMComposerThread(self.semmock, task['composes'][0],
                               'ralph', self.db_factory, compose_dir)
-        t.keep_old_composes = 2
         expected_messages = (
             update_schemas.UpdateCommentV1,
             compose_schemas.ComposeComposingV1,
@@ -1332,23 +1422,8 @@ That was the actual one'''
             if os.path.isdir(os.path.join(compose_dir, d))
             and not d.startswith("Fedora-17-updates")])
 
-        if clean_old:
-            # We expect these and only these directories to remain.
-            expected_dirs = {
-                'dist-5E-epel-161012.1854', 'dist-5E-epel-161013.1711',
-                'dist-5E-epel-testing-161003.0856', 'dist-5E-epel-testing-161006.0053',
-                'dist-6E-epel-161002.2331', 'dist-6E-epel-161003.2046',
-                'dist-6E-epel-testing-161001.0528', 'epel7-161004.1423', 'epel7-161005.1122',
-                'epel7-testing-161003.0621', 'epel7-testing-161003.2217', 'f23-updates-161004.1423',
-                'f23-updates-161005.0259', 'f23-updates-testing-161003.0621',
-                'f23-updates-testing-161003.2217', 'f24-updates-161002.2331',
-                'f24-updates-161003.1302', 'f24-updates-testing-161001.0424',
-                'this_should_get_left_alone', 'f23-updates-should_be_untouched',
-                'f23-updates.repocache', 'f23-updates-testing-blank'}
-        else:
-            # No dirs should have been removed since we had clean_old_composes set False.
-            expected_dirs = dirs
-        assert actual_dirs == expected_dirs
+        # No dirs should have been removed, the ComposerHandler cleans up once all threads finish.
+        assert actual_dirs == dirs
         # The cool file should still be here
         actual_files = [f for f in os.listdir(compose_dir)
                         if os.path.isfile(os.path.join(compose_dir, f))]
@@ -1390,7 +1465,6 @@ That was the actual one'''
 
         t = RPMComposerThread(self.semmock, task['composes'][0],
                               'ralph', self.db_factory, compose_dir)
-        t.keep_old_composes = 2
         expected_messages = (
             update_schemas.UpdateCommentV1,
             compose_schemas.ComposeComposingV1,
@@ -1893,7 +1967,8 @@ testmodule:master:20172:2
     @mock.patch('bodhi.server.tasks.composer.time.sleep')
     @mock.patch('bodhi.server.util.cmd')
     @mock.patch('bodhi.server.models.Update.update_test_gating_status', mock.Mock())
-    def test_retry_done_compose(self, mock_cmd, sleep,
+    @mock.patch('bodhi.server.tasks.composer.subprocess.Popen', wraps=subprocess.Popen)
+    def test_retry_done_compose(self, Popen, mock_cmd, sleep,
                                 mock_wait_for_sync, mock_generate_updateinfo,
                                 mock_wait_for_repo_signature, mock_stage_repo,
                                 mock_sanity_check_repo):
@@ -1942,7 +2017,8 @@ testmodule:master:20172:2
 
         # Assert that we did wait for resync
         mock_wait_for_sync.assert_called()
-        sleep.assert_called_once_with(3)
+        # Pungi should only have been started by the first run
+        Popen.assert_called_once()
 
     @mock.patch('bodhi.server.tasks.composer.PungiComposerThread._sanity_check_repo')
     @mock.patch('bodhi.server.tasks.composer.PungiComposerThread._stage_repo')
@@ -2414,6 +2490,22 @@ class TestFlatpakComposerThread__compose_updates(ComposerThreadBaseTestCase):
         assert Popen.mock_calls == expected_mock_calls
 
 
+class TestPungiComposerThread__get_createrepo_config(ComposerThreadBaseTestCase):
+    """This class contains tests for the PungiComposerThread._get_createrepo_config() method."""
+    @mock.patch('bodhi.server.tasks.composer.get_createrepo_config')
+    def test_loaded_once(self, get_createrepo_config):
+        """The createrepo_c settings should only be loaded once per compose."""
+        task = self._make_task()
+        t = PungiComposerThread(self.semmock, task['composes'][0],
+                                'bowlofeggs', self.Session, self.tempdir)
+        t.compose = Compose.from_dict(self.db, task['composes'][0])
+
+        assert t._get_createrepo_config() is get_createrepo_config.return_value
+        assert t._get_createrepo_config() is get_createrepo_config.return_value
+
+        get_createrepo_config.assert_called_once_with(t.compose.release)
+
+
 class TestPungiComposerThread__get_master_repomd_url(ComposerThreadBaseTestCase):
     """This class contains tests for the PungiComposerThread._get_master_repomd_url() method."""
     def test_alternative_arch(self):
@@ -2593,6 +2685,144 @@ class TestComposerThread__perform_tag_actions(ComposerThreadBaseTestCase):
         self.assert_sems(0)
 
 
+class TestComposerThread_update_security_bugs(ComposerThreadBaseTestCase):
+    """This test class contains tests for the ComposerThread.update_security_bugs() method."""
+    @mock.patch('bodhi.server.models.Bug.update_details')
+    @mock.patch('bodhi.server.tasks.composer.bugs.bugtracker')
+    def test_security_update(self, bugtracker, update_details):
+        """The bugs of security updates should be updated with the bugs fetched from Bugzilla."""
+        update = self.db.query(Update).one()
+        update.type = UpdateType.security
+        self.db.flush()
+        task = self._make_task()
+        t = ComposerThread(self.semmock, task['composes'][0],
+                           'bowlofeggs', self.Session, self.tempdir)
+        t.compose = Compose.from_dict(self.db, task['composes'][0])
+
+        t.update_security_bugs()
+
+        bugtracker.connect.assert_called_once_with()
+        bugtracker.getbug.assert_called_once_with(12345)
+        update_details.assert_called_once_with(bugtracker.getbug.return_value)
+
+    @mock.patch('bodhi.server.models.Bug.update_details')
+    @mock.patch('bodhi.server.tasks.composer.bugs.bugtracker')
+    def test_fetch_error(self, bugtracker, update_details):
+        """Bugs that could not be fetched should be handled without fetching them again."""
+        bugtracker.getbug.side_effect = error = IOError('oh no')
+        update = self.db.query(Update).one()
+        update.type = UpdateType.security
+        self.db.flush()
+        task = self._make_task()
+        t = ComposerThread(self.semmock, task['composes'][0],
+                           'bowlofeggs', self.Session, self.tempdir)
+        t.compose = Compose.from_dict(self.db, task['composes'][0])
+
+        t.update_security_bugs()
+
+        bugtracker.getbug.assert_called_once_with(12345)
+        update_details.assert_not_called()
+        bugtracker.update_details_failed.assert_called_once_with(error, update.bugs[0])
+
+    @mock.patch('bodhi.server.tasks.composer.bugs.bugtracker', new_callable=bugs.Bugzilla)
+    def test_private_bug(self, bugtracker):
+        """Private bugs should get their title from the fault raised while fetching them."""
+        bugtracker._bz = mock.MagicMock()
+        bugtracker._bz.getbug.side_effect = xmlrpc.client.Fault(102, 'You are not authorized')
+        update = self.db.query(Update).one()
+        update.type = UpdateType.security
+        self.db.flush()
+        task = self._make_task()
+        t = ComposerThread(self.semmock, task['composes'][0],
+                           'bowlofeggs', self.Session, self.tempdir)
+        t.compose = Compose.from_dict(self.db, task['composes'][0])
+
+        t.update_security_bugs()
+
+        bugtracker._bz.getbug.assert_called_once_with(12345)
+        assert update.bugs[0].title == 'Private bug'
+
+    @mock.patch('bodhi.server.bugs.Bugzilla._connect')
+    @mock.patch('bodhi.server.tasks.composer.bugs.bugtracker', new_callable=bugs.Bugzilla)
+    def test_connects_before_fetching(self, bugtracker, _connect):
+        """The Bugzilla client should be created once, before the workers start."""
+        def connect():
+            bugtracker._bz = mock.MagicMock()
+            bugtracker._bz.getbug.side_effect = IOError('oh no')
+
+        _connect.side_effect = connect
+        update = self.db.query(Update).one()
+        update.type = UpdateType.security
+        self.db.flush()
+        task = self._make_task()
+        t = ComposerThread(self.semmock, task['composes'][0],
+                           'bowlofeggs', self.Session, self.tempdir)
+        t.compose = Compose.from_dict(self.db, task['composes'][0])
+
+        with mock.patch('bodhi.server.tasks.composer.ThreadPoolExecutor') as executor:
+            executor.return_value.__enter__.return_value.map.return_value = []
+            t.update_security_bugs()
+
+        _connect.assert_called_once_with()
+
+    @mock.patch('bodhi.server.tasks.composer.bugs.bugtracker')
+    def test_no_security_updates(self, bugtracker):
+        """Bugzilla should not be queried if there are no security updates."""
+        task = self._make_task()
+        t = ComposerThread(self.semmock, task['composes'][0],
+                           'bowlofeggs', self.Session, self.tempdir)
+        t.compose = Compose.from_dict(self.db, task['composes'][0])
+
+        t.update_security_bugs()
+
+        bugtracker.getbug.assert_not_called()
+
+
+class TestComposerThread_expire_buildroot_overrides(ComposerThreadBaseTestCase):
+    """This test class contains tests for the ComposerThread.expire_buildroot_overrides() method."""
+    def _make_thread(self):
+        task = self._make_task()
+        t = ComposerThread(self.semmock, task['composes'][0],
+                           'bowlofeggs', self.Session, self.tempdir)
+        t.compose = Compose.from_dict(self.db, task['composes'][0])
+        t.db = self.db
+        return t
+
+    @mock.patch('bodhi.server.models.BuildrootOverride.expire')
+    def test_with_request_stable(self, expire):
+        """The active overrides of the builds of stable updates should be expired."""
+        update = self.db.query(Update).one()
+        update.request = UpdateRequest.stable
+        self.db.flush()
+        t = self._make_thread()
+
+        t.expire_buildroot_overrides()
+
+        expire.assert_called_once_with()
+
+    @mock.patch('bodhi.server.models.BuildrootOverride.expire')
+    def test_with_request_testing(self, expire):
+        """The overrides of the builds of testing updates should be left alone."""
+        t = self._make_thread()
+
+        t.expire_buildroot_overrides()
+
+        expire.assert_not_called()
+
+    @mock.patch('bodhi.server.models.BuildrootOverride.expire')
+    def test_already_expired(self, expire):
+        """Overrides that are already expired should be skipped."""
+        update = self.db.query(Update).one()
+        update.request = UpdateRequest.stable
+        update.builds[0].override.expired_date = datetime.now(timezone.utc)
+        self.db.flush()
+        t = self._make_thread()
+
+        t.expire_buildroot_overrides()
+
+        expire.assert_not_called()
+
+
 class TestComposerThread_remove_pending_tags(ComposerThreadBaseTestCase):
     """This test class contains tests for the ComposerThread.remove_pending_tags() method."""
     @mock.patch('bodhi.server.models.Update.remove_tag')
@@ -2674,7 +2904,7 @@ class TestComposerThread__determine_tag_actions(ComposerThreadBaseTestCase):
     def test_from_tag_not_found(self, get_session):
         """Updates should be ejected if the from tag cannot be determined."""
         tags = ['some', 'unknown', 'tags']
-        get_session.return_value.listTags.return_value = [{'name': n} for n in tags]
+        get_session.return_value.multiCall.return_value = [[[{'name': n} for n in tags]]]
         task = self._make_task()
         t = ComposerThread(self.semmock, task['composes'][0],
                            'bowlofeggs', self.Session, self.tempdir)
@@ -2704,6 +2934,50 @@ class TestComposerThread__determine_tag_actions(ComposerThreadBaseTestCase):
         self.assert_sems(0)
 
 
+class TestComposerThread__get_koji_session(ComposerThreadBaseTestCase):
+    """Test ComposerThread._get_koji_session()."""
+
+    @mock.patch('bodhi.server.tasks.composer.buildsys.get_session')
+    def test_reused(self, get_session):
+        """The thread should log in to Koji once and reuse the session."""
+        t = ComposerThread(self.semmock, self._make_task()['composes'][0],
+                           'bowlofeggs', self.Session, self.tempdir)
+
+        assert t._get_koji_session() is get_session.return_value
+        assert t._get_koji_session() is get_session.return_value
+
+        get_session.assert_called_once_with()
+
+
+class TestComposerThread__get_build_tags(ComposerThreadBaseTestCase):
+    """Test ComposerThread._get_build_tags()."""
+
+    def test_tags(self):
+        """The tags of all the builds should be retrieved with one multicall."""
+        builds = self.db.query(Build).all()
+        koji = mock.MagicMock()
+        koji.multiCall.return_value = [
+            [[{'name': 'f17-updates-candidate'}, {'name': 'f17-updates-testing'}]]]
+
+        build_tags = ComposerThread._get_build_tags(koji, builds)
+
+        assert build_tags == {builds[0].nvr: ['f17-updates-candidate', 'f17-updates-testing']}
+        koji.listTags.assert_called_once_with(builds[0].nvr)
+        koji.multiCall.assert_called_once_with()
+
+    def test_fault(self):
+        """An Exception should be raised if Koji returns an error for a build."""
+        builds = self.db.query(Build).all()
+        koji = mock.MagicMock()
+        koji.multiCall.return_value = [{'faultCode': 1000}]
+
+        with pytest.raises(Exception) as exc:
+            ComposerThread._get_build_tags(koji, builds)
+
+        assert str(exc.value) == \
+            "Unable to list the tags of {}: {{'faultCode': 1000}}".format(builds[0].nvr)
+
+
 class TestComposerThread_eject_from_compose(ComposerThreadBaseTestCase):
     """This test class contains tests for the ComposerThread.eject_from_compose() method."""
     def test_testing_request(self):
@@ -2850,6 +3124,27 @@ class TestComposerThread_save_state(ComposerThreadBaseTestCase):
         assert json.loads(compose.checkpoints) == {'cool': 'checkpoint'}
         t.db.commit.assert_called_once_with()
 
+    def test_unchanged_checkpoints(self):
+        """The checkpoints should not be rewritten if they have not changed since the last save."""
+        t = ComposerThread(self.semmock, self._make_task()['composes'][0],
+                           'bowlofeggs', self.Session, self.tempdir)
+        t._checkpoints = {'cool': 'checkpoint'}
+        t.compose = mock.MagicMock(checkpoints='untouched')
+        t.db = mock.MagicMock()
+        t._saved_checkpoints = json.dumps({'cool': 'checkpoint'})
+
+        t.save_state(ComposeState.notifying)
+
+        assert t.compose.checkpoints == 'untouched'
+        assert t.compose.state == ComposeState.notifying
+        t.db.commit.assert_called_once_with()
+
+        t._checkpoints['other'] = 'checkpoint'
+        t.save_state()
+
+        assert json.loads(t.compose.checkpoints) == {'cool': 'checkpoint', 'other': 'checkpoint'}
+        assert t._saved_checkpoints == t.compose.checkpoints
+
 
 class TestPungiComposerThread__wait_for_sync(ComposerThreadBaseTestCase):
     """This test class contains tests for the PungiComposerThread._wait_for_sync() method."""
@@ -3377,17 +3672,24 @@ class TestComposerThread__unlock_updates(ComposerThreadBaseTestCase):
     """Test the _unlock_updates() method."""
     def test__unlock_updates(self):
         """Assert that _unlock_updates() works correctly."""
-        update = Update.query.one()
+        update = self.db.query(Update).one()
         update.request = UpdateRequest.testing
+        update.locked = True
         t = ComposerThread(self.semmock, self._make_task()['composes'][0],
                            'bowlofeggs', self.Session, self.tempdir)
         t.compose = self.db.query(Compose).one()
+        t.db = self.db
 
         t._unlock_updates()
 
-        update = Update.query.one()
+        # The Update already loaded in the session should see the new values without being
+        # expired or reloaded, since the rest of the compose keeps using it.
+        assert update in t.compose.updates
         assert update.request is None
-        assert not update.locked
+        assert update.locked is False
+        self.db.expire(update)
+        assert update.request is None
+        assert update.locked is False
 
 
 class TestPungiComposerThread__punge(ComposerThreadBaseTestCase):
@@ -3406,6 +3708,28 @@ class TestPungiComposerThread__punge(ComposerThreadBaseTestCase):
         # Popen() should not have been called since we should have skipping running pungi.
         assert Popen.call_count == 0
 
+    @mock.patch('bodhi.server.tasks.composer.PungiComposerThread._create_pungi_config')
+    @mock.patch('bodhi.server.tasks.composer.subprocess.Popen')
+    @mock.patch('bodhi.server.tasks.composer.log')
+    def test_startup_failure(self, mocked_log, Popen, _create_pungi_config):
+        """If pungi fails during startup, the output it wrote so far should be logged."""
+        Popen.return_value.stdout = io.BytesIO(b'')
+        Popen.return_value.stderr = io.BytesIO(b'bad config\n')
+        Popen.return_value.returncode = 1
+        t = PungiComposerThread(self.semmock, self._make_task()['composes'][0],
+                                'bowlofeggs', self.Session, self.tempdir)
+        t._pungi_conf_dir = self.tempdir
+
+        with pytest.raises(Exception) as exc:
+            t._punge()
+
+        assert str(exc.value) == 'Pungi returned error, aborting!'
+        Popen.return_value.wait.assert_called_once_with(timeout=t.pungi_startup_timeout)
+        assert mocked_log.error.mock_calls == [
+            mock.call('Pungi process terminated with error within %s seconds! Abandoning!',
+                      t.pungi_startup_timeout),
+            mock.call('Stderr: %s', 'bad config')]
+
 
 class TestPungiComposerThread__stage_repo(ComposerThreadBaseTestCase):
     """Test PungiComposerThread._stage_repo()."""
@@ -3430,7 +3754,28 @@ class TestPungiComposerThread__stage_repo(ComposerThreadBaseTestCase):
         assert os.path.islink(link)
         assert os.readlink(link) == t.path
         assert mocked_log.info.mock_calls == \
-            [mock.call(f'Creating symlink: {link} => {t.path}')]
+            [mock.call('Creating symlink: %s => %s', link, t.path)]
+
+    def test_replaces_old_link(self):
+        """The link to the last run should be replaced, even if a stale new link is around."""
+        t = PungiComposerThread(self.semmock, self._make_task()['composes'][0],
+                                'ralph', self.Session, self.tempdir)
+        t.id = 'f17-updates-testing'
+        t.path = os.path.join(self.tempdir, 'f17-updates-testing-new')
+        old_path = os.path.join(self.tempdir, 'f17-updates-testing-old')
+        stage_dir = os.path.join(self.tempdir, 'stage_dir')
+        os.makedirs(t.path)
+        os.makedirs(old_path)
+        os.mkdir(stage_dir)
+        link = os.path.join(stage_dir, t.id)
+        os.symlink(old_path, link)
+        os.symlink(old_path, f'{link}.new')
+
+        config["compose_stage_dir"] = stage_dir
+        t._stage_repo()
+
+        assert os.readlink(link) == t.path
+        assert os.listdir(stage_dir) == [t.id]
 
     @mock.patch('bodhi.server.tasks.composer.log')
     def test_stage_dir_de(self, mocked_log):
@@ -3452,7 +3797,7 @@ class TestPungiComposerThread__stage_repo(ComposerThreadBaseTestCase):
         assert os.path.islink(link)
         assert os.readlink(link) == t.path
         assert mocked_log.info.mock_calls == \
-            [mock.call(f'Creating symlink: {link} => {t.path}')]
+            [mock.call('Creating symlink: %s => %s', link, t.path)]
 
     @mock.patch('bodhi.server.tasks.composer.log')
     def test_stage_dir_dne(self, mocked_log):
@@ -3473,7 +3818,7 @@ class TestPungiComposerThread__stage_repo(ComposerThreadBaseTestCase):
         assert os.readlink(link) == t.path
         assert mocked_log.info.mock_calls == \
             [mock.call('Creating compose_stage_dir %s', stage_dir),
-             mock.call(f'Creating symlink: {link} => {t.path}')]
+             mock.call('Creating symlink: %s => %s', link, t.path)]
 
 
 class TestPungiComposerThread__wait_for_repo_signature(ComposerThreadBaseTestCase):
@@ -3567,3 +3912,80 @@ class TestPungiComposerThread__wait_for_pungi(ComposerThreadBaseTestCase):
             [mock.call('Compose object updated.'),
              mock.call('Not waiting for pungi process, as there was no pungi')]
         assert t.compose.state == ComposeState.punging
+
+    @mock.patch('bodhi.server.tasks.composer.log')
+    def test_pungi_failed(self, mocked_log):
+        """Only the tail of pungi's stderr should be logged if pungi fails."""
+        t = PungiComposerThread(self.semmock, self._make_task()['composes'][0],
+                                'ralph', self.Session, self.tempdir)
+        t.compose = self.db.query(Compose).one()
+        t.db = self.Session
+        t._checkpoints = {}
+        t.pungi_output_lines = 2
+        pungi_process = mock.MagicMock()
+        pungi_process.stdout = io.BytesIO(b'')
+        pungi_process.stderr = io.BytesIO(b'first\nsecond\nthird\n')
+        pungi_process.returncode = 1
+
+        with pytest.raises(Exception) as exc:
+            t._wait_for_pungi(pungi_process)
+
+        assert str(exc.value) == 'Pungi exited with status 1'
+        pungi_process.wait.assert_called_once_with()
+        assert mocked_log.debug.mock_calls == [
+            mock.call('Pungi %s: %s', 'stderr', 'first'),
+            mock.call('Pungi %s: %s', 'stderr', 'second'),
+            mock.call('Pungi %s: %s', 'stderr', 'third')]
+        assert mocked_log.error.mock_calls == [
+            mock.call('Pungi exited with exit code %d', 1),
+            mock.call('Stderr: %s', 'second\nthird')]
+
+    @mock.patch('bodhi.server.tasks.composer.log')
+    def test_pungi_output_not_utf8(self, mocked_log):
+        """Output that is not valid UTF-8 should not stop the output from being read."""
+        t = PungiComposerThread(self.semmock, self._make_task()['composes'][0],
+                                'ralph', self.Session, self.tempdir)
+        t.compose = self.db.query(Compose).one()
+        t.db = self.Session
+        t._checkpoints = {}
+        pungi_process = mock.MagicMock()
+        pungi_process.stdout = io.BytesIO(b'')
+        pungi_process.stderr = io.BytesIO(b'bad \xff byte\nlast line\n')
+        pungi_process.returncode = 1
+
+        with pytest.raises(Exception) as exc:
+            t._wait_for_pungi(pungi_process)
+
+        assert str(exc.value) == 'Pungi exited with status 1'
+        assert pungi_process.stderr.read() == b''
+        assert mocked_log.error.mock_calls == [
+            mock.call('Pungi exited with exit code %d', 1),
+            mock.call('Stderr: %s', 'bad \ufffd byte\nlast line')]
+
+    @mock.patch('bodhi.server.tasks.composer.log')
+    def test_output_read_since_startup(self, mocked_log):
+        """The output that was read while pungi was running should be used once it exits."""
+        t = PungiComposerThread(self.semmock, self._make_task()['composes'][0],
+                                'ralph', self.Session, self.tempdir)
+        t.compose = self.db.query(Compose).one()
+        t.db = self.Session
+        t._checkpoints = {}
+        pungi_process = mock.MagicMock()
+        pungi_process.stdout = io.BytesIO(b'Compose dir: /some/path\n')
+        pungi_process.stderr = io.BytesIO(b'')
+        pungi_process.returncode = 0
+
+        t._read_pungi_output(pungi_process)
+        for reader in t._pungi_output.readers:
+            reader.join()
+
+        # Pungi's output has been consumed without waiting for pungi to exit.
+        assert pungi_process.stdout.read() == b''
+        pungi_process.wait.assert_not_called()
+
+        with pytest.raises(Exception) as exc:
+            t._wait_for_pungi(pungi_process)
+
+        assert str(exc.value) == 'Directory at /some/path does not look like a compose'
+        assert t.path == '/some/path'
+        pungi_process.wait.assert_called_once_with()
@@ -97,6 +97,25 @@ class TestBugzilla:
                                          cookiefile=None, tokenfile=None)
         assert return_value is bz._bz
 
+    @mock.patch('bodhi.server.bugs.Bugzilla._connect')
+    def test_connect_with__bz_None(self, _connect):
+        """Assert that connect() creates the client when _bz is None."""
+        bz = bugs.Bugzilla()
+
+        bz.connect()
+
+        _connect.assert_called_once_with()
+
+    @mock.patch('bodhi.server.bugs.Bugzilla._connect')
+    def test_connect_with__bz_set(self, _connect):
+        """Assert that connect() does not create another client when _bz is already set."""
+        bz = bugs.Bugzilla()
+        bz._bz = mock.MagicMock()
+
+        bz.connect()
+
+        assert _connect.call_count == 0
+
     @mock.patch('bodhi.server.bugs.Bugzilla._connect')
     def test_bz_with__bz_set(self, _connect):
         """
@@ -421,11 +440,11 @@ class TestBugzilla:
         """Test we log an exception if update_details raises one"""
         bz = bugs.Bugzilla()
         bz._bz = mock.MagicMock()
-        bz._bz.getbug.side_effect = Exception()
+        bz._bz.getbug.side_effect = exc = Exception()
 
         bz.update_details(0, 0)
 
-        mock_exceptionlog.assert_called_once_with('Unknown exception from Bugzilla')
+        mock_exceptionlog.assert_called_once_with('Unknown exception from Bugzilla', exc_info=exc)
 
     def test_update_details_keywords_str(self):
         """Assert that we split the keywords into a list when they are a str."""
@@ -477,7 +496,7 @@ class TestBugzilla:
         """Test we log an error if update_details raises one"""
         bz = bugs.Bugzilla()
         bz._bz = mock.MagicMock()
-        bz._bz.getbug.side_effect = xmlrpc.client.Fault(42, 'You found the meaning.')
+        bz._bz.getbug.side_effect = fault = xmlrpc.client.Fault(42, 'You found the meaning.')
         bug = mock.MagicMock()
         bug.bug_id = 123
 
@@ -487,7 +506,7 @@ class TestBugzilla:
         bz._bz.getbug.assert_called_once_with(123)
         error.assert_called_once_with(
             'Got fault from Bugzilla on #%d: fault code: %d, fault string: %s', 123, 42,
-            'You found the meaning.', exc_info=True)
+            'You found the meaning.', exc_info=fault)
 
     @mock.patch('bodhi.server.bugs.log.exception')
     @mock.patch.dict('bodhi.server.bugs.config', {'bz_products': 'aproduct'})
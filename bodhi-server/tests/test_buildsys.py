@@ -298,13 +298,20 @@ class TestSetupBuildsystem:
 class TestWaitForTasks:
     """Test the wait_for_tasks() function."""
 
+    @staticmethod
+    def _info(state):
+        """Return a multicall result for getTaskInfo() with the given task state."""
+        return [{'state': koji.TASK_STATES[state]}]
+
     @mock.patch('bodhi.server.buildsys.time.sleep')
     def test_wait_on_unfinished_task(self, sleep, debug):
         """Assert that we wait on unfinished tasks for sleep seconds."""
         tasks = [1, 2, 3]
         session = mock.MagicMock()
-        session.taskFinished.side_effect = [True, False, False, True, True]
-        session.getTaskInfo.return_value = {'state': koji.TASK_STATES['CLOSED']}
+        session.multiCall.side_effect = [
+            [self._info('CLOSED'), self._info('OPEN'), self._info('FREE')],
+            [self._info('OPEN'), self._info('CLOSED')],
+            [self._info('CLOSED')]]
 
         ret = buildsys.wait_for_tasks(tasks, session, sleep=0.01)
 
@@ -312,38 +319,46 @@ class TestWaitForTasks:
         assert debug.mock_calls == (
             [mock.call('Waiting for 3 tasks to complete: [1, 2, 3]'),
              mock.call('3 tasks completed successfully, 0 tasks failed.')])
-        assert session.taskFinished.mock_calls == (
-            [mock.call(1), mock.call(2), mock.call(2), mock.call(2), mock.call(3)])
+        # Only the unfinished tasks should be polled again.
+        assert session.getTaskInfo.mock_calls == (
+            [mock.call(1), mock.call(2), mock.call(3), mock.call(2), mock.call(3), mock.call(2)])
+        assert session.multiCall.call_count == 3
         assert sleep.mock_calls == [mock.call(0.01), mock.call(0.01)]
-        assert session.getTaskInfo.mock_calls == [mock.call(1), mock.call(2), mock.call(3)]
 
     def test_with_failed_task(self, debug):
         """Assert that we return a list of failed_tasks."""
         tasks = [1, 2, 3]
         session = mock.MagicMock()
-        session.taskFinished.side_effect = [True, True, True]
-        session.getTaskInfo.side_effect = [
-            {'state': koji.TASK_STATES['CLOSED']},
-            {'state': koji.TASK_STATES['FAILED']},
-            {'state': koji.TASK_STATES['CLOSED']}]
+        session.multiCall.return_value = [
+            self._info('CLOSED'), self._info('FAILED'), self._info('CANCELED')]
 
         ret = buildsys.wait_for_tasks(tasks, session, sleep=0.01)
 
-        assert ret == [2]
+        assert ret == [2, 3]
         assert debug.mock_calls == (
             [mock.call('Waiting for 3 tasks to complete: [1, 2, 3]'),
-             mock.call('2 tasks completed successfully, 1 tasks failed.')])
-        assert session.taskFinished.mock_calls == [mock.call(1), mock.call(2), mock.call(3)]
+             mock.call('1 tasks completed successfully, 2 tasks failed.')])
         assert session.getTaskInfo.mock_calls == [mock.call(1), mock.call(2), mock.call(3)]
+        session.multiCall.assert_called_once_with()
+
+    @mock.patch('bodhi.server.buildsys.log.error')
+    def test_with_fault(self, error, debug):
+        """Assert that a task whose info could not be retrieved is reported as failed."""
+        tasks = [1, 2]
+        session = mock.MagicMock()
+        fault = {'faultCode': 1000, 'faultString': 'oh no'}
+        session.multiCall.return_value = [self._info('CLOSED'), fault]
+
+        ret = buildsys.wait_for_tasks(tasks, session, sleep=0.01)
+
+        assert ret == [2]
+        error.assert_called_once_with(f'Unable to get info for Koji task 2: {fault!r}')
 
     def test_with_falsey_task(self, debug):
         """Assert that a Falsey entry in the list doesn't raise an Exception."""
         tasks = [1, False, 3]
         session = mock.MagicMock()
-        session.taskFinished.side_effect = [True, True]
-        session.getTaskInfo.side_effect = [
-            {'state': koji.TASK_STATES['CLOSED']},
-            {'state': koji.TASK_STATES['CLOSED']}]
+        session.multiCall.return_value = [self._info('CLOSED'), self._info('CLOSED')]
 
         ret = buildsys.wait_for_tasks(tasks, session, sleep=0.01)
 
@@ -352,18 +367,14 @@ class TestWaitForTasks:
             [mock.call('Waiting for 3 tasks to complete: [1, False, 3]'),
              mock.call('Skipping task: False'),
              mock.call('3 tasks completed successfully, 0 tasks failed.')])
-        assert session.taskFinished.mock_calls == [mock.call(1), mock.call(3)]
         assert session.getTaskInfo.mock_calls == [mock.call(1), mock.call(3)]
 
     def test_with_successful_tasks(self, debug):
         """A list of successful tasks should return []."""
         tasks = [1, 2, 3]
         session = mock.MagicMock()
-        session.taskFinished.side_effect = [True, True, True]
-        session.getTaskInfo.side_effect = [
-            {'state': koji.TASK_STATES['CLOSED']},
-            {'state': koji.TASK_STATES['CLOSED']},
-            {'state': koji.TASK_STATES['CLOSED']}]
+        session.multiCall.return_value = [
+            self._info('CLOSED'), self._info('CLOSED'), self._info('CLOSED')]
 
         ret = buildsys.wait_for_tasks(tasks, session, sleep=0.01)
 
@@ -371,18 +382,24 @@ class TestWaitForTasks:
         assert debug.mock_calls == (
             [mock.call('Waiting for 3 tasks to complete: [1, 2, 3]'),
              mock.call('3 tasks completed successfully, 0 tasks failed.')])
-        assert session.taskFinished.mock_calls == [mock.call(1), mock.call(2), mock.call(3)]
         assert session.getTaskInfo.mock_calls == [mock.call(1), mock.call(2), mock.call(3)]
+        session.multiCall.assert_called_once_with()
+
+    def test_without_tasks(self, debug):
+        """Koji should not be called if there are no tasks to wait for."""
+        session = mock.MagicMock()
+
+        ret = buildsys.wait_for_tasks([], session, sleep=0.01)
+
+        assert ret == []
+        session.multiCall.assert_not_called()
 
     @mock.patch('bodhi.server.buildsys.get_session')
     def test_without_session(self, get_session, debug):
         """Test the function without handing it a Koji session."""
         tasks = [1, 2, 3]
-        get_session.return_value.taskFinished.side_effect = [True, True, True]
-        get_session.return_value.getTaskInfo.side_effect = [
-            {'state': koji.TASK_STATES['CLOSED']},
-            {'state': koji.TASK_STATES['CLOSED']},
-            {'state': koji.TASK_STATES['CLOSED']}]
+        get_session.return_value.multiCall.return_value = [
+            self._info('CLOSED'), self._info('CLOSED'), self._info('CLOSED')]
 
         ret = buildsys.wait_for_tasks(tasks, sleep=0.01)
 
@@ -391,7 +408,5 @@ class TestWaitForTasks:
             [mock.call('Waiting for 3 tasks to complete: [1, 2, 3]'),
              mock.call('3 tasks completed successfully, 0 tasks failed.')])
         get_session.assert_called_once_with()
-        assert get_session.return_value.taskFinished.mock_calls == (
-            [mock.call(1), mock.call(2), mock.call(3)])
         assert get_session.return_value.getTaskInfo.mock_calls == (
             [mock.call(1), mock.call(2), mock.call(3)])
@@ -327,6 +327,37 @@ class TestValidateBoolTests:
             assert config._validate_bool(s)
 
 
+class TestValidateCmdlineTests:
+    """This class contains tests for the _validate_cmdline() function."""
+    def test_list(self):
+        """Test with a list."""
+        result = config._validate_cmdline(['--label', 'Update 1'])
+
+        assert result == ['--label', 'Update 1']
+
+    def test_other(self):
+        """Test with a non-string and non-list type."""
+        with pytest.raises(ValueError) as exc:
+            config._validate_cmdline({'lol': 'wut'})
+
+        assert str(exc.value) == '"{\'lol\': \'wut\'}" cannot be interpreted as a list.'
+
+    def test_string(self):
+        """Test with a string, which should be split with shell-like syntax."""
+        result = config._validate_cmdline(
+            '--notification-script=/usr/bin/notify  --label "Update 1" --old-composes=\'/a b\'')
+
+        assert result == ['--notification-script=/usr/bin/notify', '--label', 'Update 1',
+                          '--old-composes=/a b']
+
+    def test_string_unbalanced_quotes(self):
+        """Test with a string that has an unterminated quote."""
+        with pytest.raises(ValueError) as exc:
+            config._validate_cmdline('--label "Update 1')
+
+        assert str(exc.value) == 'No closing quotation'
+
+
 class TestValidateNoneOrTests:
     """Test the _validate_none_or() function."""
     def test_with_none(self):
@@ -162,6 +162,18 @@ Let's also have some code:
         assert 'Some fancy update description:' in t
         assert '```<test@example.com>```' not in t
 
+    @mock.patch('bodhi.server.mail.read_template', wraps=mail.read_template)
+    def test_get_templates(self, read_template):
+        """get_templates() should render every update while reading the template only once."""
+        u1 = self.create_update(['TurboGears-2.0.0.0-1.fc17'])
+        u2 = self.db.query(models.Update).filter(models.Update.id != u1.id).first()
+
+        templates = mail.get_templates([u1, u2], use_template='maillist_template')
+
+        read_template.assert_called_once_with('maillist_template')
+        assert templates == {u1: mail.get_template(u1, use_template='maillist_template'),
+                             u2: mail.get_template(u2, use_template='maillist_template')}
+
     def test_read_template(self):
         """Ensure that email template is read correctly."""
         tpl_name = "maillist_template"
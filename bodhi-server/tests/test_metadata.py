@@ -25,6 +25,7 @@ import os
 import shutil
 import tempfile
 
+from munch import munchify
 import createrepo_c
 import pytest
 
@@ -386,6 +387,19 @@ class TestUpdateInfoMetadata(UpdateInfoMetadataTestCase):
         assert md.zchunk
         info.assert_any_call('Using createrepo_c defaults config.')
 
+    @mock.patch('bodhi.server.metadata.util.get_createrepo_config')
+    def test___init___with_createrepo_c_settings(self, get_createrepo_config):
+        """Assert that given createrepo_c settings are used instead of loading them again."""
+        fedora = Release.query.one()
+        settings = munchify({'uinfo_comp': 'BZ2', 'zchunk': False})
+
+        md = UpdateInfoMetadata(fedora, UpdateRequest.stable, self.db, self.tempdir,
+                                createrepo_c_settings=settings)
+
+        assert md.comp_type == createrepo_c.BZ2
+        assert not md.zchunk
+        get_createrepo_config.assert_not_called()
+
     def test_extended_metadata_once(self):
         """Assert that a single call to update the metadata works as expected."""
         self._test_extended_metadata()
@@ -30,6 +30,7 @@ from fedora_messaging.testing import mock_sends
 from mediawiki.exceptions import HTTPTimeoutError, MediaWikiAPIURLError
 from pyramid.testing import DummyRequest
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import NoResultFound
 import cornice
 import pytest
 import requests.exceptions
@@ -565,6 +566,44 @@ class TestCompose(BasePyTestCase):
         assert reloaded_compose.request == compose.request
         assert reloaded_compose.release == compose.release
 
+    def test_from_dicts(self):
+        """Assert that from_dicts() returns the Composes in the requested order."""
+        stable = self._generate_compose(model.UpdateRequest.stable, False)
+        testing = model.Compose(release=stable.release, request=model.UpdateRequest.testing)
+        self.db.add(testing)
+        self.db.flush()
+
+        reloaded = model.Compose.from_dicts(self.db, [testing.__json__(), stable.__json__()])
+
+        assert reloaded == [testing, stable]
+
+    def test_from_dicts_for_update(self):
+        """Assert that from_dicts() locks the rows of the Composes if for_update is True."""
+        compose = self._generate_compose(model.UpdateRequest.stable, False)
+
+        with mock.patch('sqlalchemy.orm.Query.with_for_update', autospec=True,
+                        side_effect=lambda query: query) as with_for_update:
+            reloaded = model.Compose.from_dicts(self.db, [compose.__json__()], for_update=True)
+
+        assert reloaded == [compose]
+        with_for_update.assert_called_once()
+        # The rows should be locked in a consistent order, to avoid deadlocks.
+        query = with_for_update.mock_calls[0][1][0]
+        assert 'ORDER BY composes.release_id, composes.request' in str(query.statement)
+
+    def test_from_dicts_empty(self):
+        """Assert that from_dicts() returns an empty list without querying for no Composes."""
+        assert model.Compose.from_dicts(self.db, []) == []
+
+    def test_from_dicts_missing(self):
+        """Assert that from_dicts() raises NoResultFound if a Compose does not exist."""
+        compose = self._generate_compose(model.UpdateRequest.stable, False)
+        missing = compose.__json__()
+        missing['release_id'] = 65535
+
+        with pytest.raises(NoResultFound):
+            model.Compose.from_dicts(self.db, [compose.__json__(), missing])
+
     def test_from_updates(self):
         """Assert that from_updates() correctly generates Composes."""
         update_1 = self.create_update(['bodhi-{}-1.fc27'.format(uuid.uuid4())])